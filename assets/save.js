@@ -0,0 +1,51 @@
+// Clientside helpers for the XRD tool. The plot is already rendered by
+// Plotly.js in the browser, so PNG export happens here without a server
+// round-trip or a headless-browser render.
+window.dash_clientside = Object.assign({}, window.dash_clientside, {
+    xrd: {
+        savePlot: function (nWhite, nTransparent, widthRatio, heightRatio, quality) {
+            var ctx = window.dash_clientside.callback_context;
+            if (!ctx.triggered || !ctx.triggered.length) {
+                return window.dash_clientside.no_update;
+            }
+            var transparent = ctx.triggered[0].prop_id.indexOf('save-transparent-button') === 0;
+
+            var wrapper = document.getElementById('graph');
+            var gd = wrapper && wrapper.querySelector('.js-plotly-plot');
+            if (!gd || !gd.data) {
+                return window.dash_clientside.no_update;
+            }
+
+            // Mirror the aspect-ratio inputs: 800px wide at the chosen ratio.
+            var height = 600;
+            var w = parseFloat(widthRatio);
+            var h = parseFloat(heightRatio);
+            if (isFinite(w) && isFinite(h) && w > 0) {
+                height = Math.round(800 * (h / w));
+            }
+
+            var layout = Object.assign({}, gd.layout);
+            if (transparent) {
+                layout.paper_bgcolor = 'rgba(0,0,0,0)';
+                layout.plot_bgcolor = 'rgba(0,0,0,0)';
+            }
+
+            // Draft saves render at screen resolution; 'final' rasterizes at
+            // 4x for publication-quality output, which takes noticeably longer.
+            var scale = quality === 'final' ? 4 : 1;
+
+            Plotly.toImage(
+                {data: gd.data, layout: layout},
+                {format: 'png', width: 800, height: height, scale: scale}
+            ).then(function (url) {
+                var link = document.createElement('a');
+                link.href = url;
+                link.download = transparent ? 'plot_transparent.png' : 'plot_white.png';
+                document.body.appendChild(link);
+                link.click();
+                document.body.removeChild(link);
+            });
+            return window.dash_clientside.no_update;
+        }
+    }
+});
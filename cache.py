@@ -0,0 +1,9 @@
+from flask_caching import Cache
+
+# Shared server-side cache. It is created unbound here so that any module can
+# import it, and bound to the Flask server in main.py before the app starts.
+cache = Cache(config={
+    'CACHE_TYPE': 'FileSystemCache',
+    'CACHE_DIR': '.cache',
+    'CACHE_DEFAULT_TIMEOUT': 600
+})
@@ -1,32 +1,63 @@
 import dash
+import functools
+from concurrent.futures import ThreadPoolExecutor
 import plotly.graph_objects as go
-from dash import dcc, Input, Output, State, ALL, callback_context
-import plotly.io as pio
+from dash import Input, Output, State, ALL, Patch, ClientsideFunction, callback_context
 import numpy as np
-import io
 
-from utils import generate_figure, parse_contents
+from utils import generate_figure_json, parse_contents, parse_xy, trace_updates
+from datastore import put_arrays, get_arrays
 from layout import create_file_control
 
+# Legend placement never varies; build the dict once instead of per render.
+_LEGEND_CONFIG = dict(
+    font=dict(family="Dejavu Sans", size=20),
+    yanchor='top',
+    xanchor='right',
+    x=0.99,
+    y=0.99,
+)
+
 def compute_default_angles(files):
     """
     Computes the default min and max angles from the uploaded files.
-    Reads the first column from each file (parsed as a string) using np.genfromtxt.
+    Decodes only the angle column of each file and tracks a running min/max,
+    so peak memory stays constant regardless of file size.
     """
-    all_angles = []
+    cur_min = None
+    cur_max = None
     for file in files:
-        try:
-            data = np.genfromtxt(io.StringIO(file["content"]))
-            if data.ndim < 2 or data.shape[1] < 2:
-                continue
-            angles = data[:, 0]
-            all_angles.extend(angles)
-        except Exception:
+        arrays = get_arrays(file["id"])
+        if arrays is None:
+            continue
+        angles = arrays[0]
+        if angles.size == 0:
             continue
-    if all_angles:
-        return float(min(all_angles)), float(max(all_angles))
+        file_min = float(angles.min())
+        file_max = float(angles.max())
+        cur_min = file_min if cur_min is None else min(cur_min, file_min)
+        cur_max = file_max if cur_max is None else max(cur_max, file_max)
+    if cur_min is not None:
+        return cur_min, cur_max
     return 10, 90  # Fallback defaults if no valid data is found.
 
+# Side table mapping a files key to the actual file list, mirroring the
+# memoization pattern in utils, so the LRU key stays small.
+_ANGLE_FILES_BY_KEY = {}
+
+@functools.lru_cache(maxsize=8)
+def _compute_default_angles_cached(files_key):
+    return compute_default_angles(_ANGLE_FILES_BY_KEY[files_key])
+
+def compute_default_angles_cached(files):
+    """
+    Memoized wrapper around compute_default_angles, so repeated resets and
+    autorange clicks on an unchanged file list skip re-parsing every file.
+    """
+    files_key = tuple((file["filename"], file["id"]) for file in files)
+    _ANGLE_FILES_BY_KEY[files_key] = files
+    return _compute_default_angles_cached(files_key)
+
 def register_callbacks(app):
     # Callback: Update the file store when files are uploaded.
     @app.callback(
@@ -42,32 +73,68 @@ def register_callbacks(app):
             if not isinstance(upload_contents, list):
                 upload_contents = [upload_contents]
                 upload_filenames = [upload_filenames]
-            new_files = [
-                {"filename": fname, "content": parse_contents(contents)}
-                for contents, fname in zip(upload_contents, upload_filenames)
-            ]
-            current_files.extend(new_files)
+            # Parse once at upload time; downstream callbacks consume the
+            # compact numeric arrays instead of re-parsing text. A multi-file
+            # drop is parsed concurrently - the base64 decode and numpy text
+            # parsing run in C code that releases the GIL.
+            if len(upload_contents) > 1:
+                with ThreadPoolExecutor(max_workers=min(8, len(upload_contents))) as ex:
+                    parsed_uploads = list(ex.map(
+                        lambda contents: parse_xy(parse_contents(contents)),
+                        upload_contents))
+            else:
+                parsed_uploads = [parse_xy(parse_contents(upload_contents[0]))]
+            for parsed, fname in zip(parsed_uploads, upload_filenames):
+                if parsed is None:
+                    continue
+                x, y = parsed
+                # Scale intensities to unit maximum (the display pipeline
+                # min/max-normalizes per angle window, so this is
+                # display-invariant and keeps stored values well-conditioned).
+                y_max = float(np.abs(y).max()) if y.size else 0.0
+                if y_max > 0:
+                    y = y / y_max
+                # The arrays stay server-side; the store only carries the id.
+                current_files.append({
+                    "filename": fname,
+                    "id": put_arrays(x, y),
+                    "n": int(x.size)
+                })
         return current_files
 
-    # Callback: Update per-file controls based on current files.
+    # Callback: Update per-file controls based on current files. Files are only
+    # ever appended, so existing rows are kept and new ones are sent as a
+    # children patch instead of rebuilding the whole section.
     @app.callback(
         Output("per-file-controls-section", "children"),
-        Input("file-store", "data")
+        Output("file-count-store", "data"),
+        Input("file-store", "data"),
+        State("file-count-store", "data")
     )
-    def update_per_file_controls(files):
+    def update_per_file_controls(files, prev_count):
+        files = files or []
+        prev_count = prev_count or 0
         if not files:
-            return []
-        return [create_file_control(i, file["filename"]) for i, file in enumerate(files)]
+            return [], 0
+        if len(files) == prev_count:
+            return dash.no_update, prev_count
+        if len(files) > prev_count > 0:
+            patched = Patch()
+            for i in range(prev_count, len(files)):
+                patched.append(create_file_control(i, files[i]["filename"]))
+            return patched, len(files)
+        return ([create_file_control(i, file["filename"]) for i, file in enumerate(files)],
+                len(files))
 
-    # Callback: Toggle the legend store (flip True/False) when legend button is clicked.
-    @app.callback(
+    # Clientside callback: Toggle the legend store (flip True/False) when legend button is clicked.
+    # A one-line boolean flip does not need a server round-trip.
+    app.clientside_callback(
+        "function(n_clicks, show_legend) { return !show_legend; }",
         Output("legend-store", "data"),
         Input("legend-button", "n_clicks"),
         State("legend-store", "data"),
         prevent_initial_call=True
     )
-    def toggle_legend(n_clicks, show_legend):
-        return not show_legend
 
     # Callback: Update the graph based on slider inputs, files, and legend visibility.
     @app.callback(
@@ -78,7 +145,7 @@ def register_callbacks(app):
         Input({'type': 'bg-slider', 'index': ALL}, 'value'),
         Input({'type': 'int-slider', 'index': ALL}, 'value'),
         Input('file-store', 'data'),
-        Input('legend-store', 'data')  # <--- Legend visibility
+        State('legend-store', 'data')  # Read-only: legend toggles patch the figure below.
     )
     def update_graph(angle_min, angle_max, global_sep, bg_values, int_values, files, show_legend):
         if not files:
@@ -89,20 +156,38 @@ def register_callbacks(app):
         if not int_values or len(int_values) != len(files):
             int_values = [100] * len(files)
 
-        fig = generate_figure(angle_min, angle_max, global_sep, bg_values, int_values, files)
+        # Moving a bg/intensity/separation slider only rescales the existing
+        # traces: x, ticks, and layout are unaffected. Ship just the new per-
+        # trace y arrays as a Patch instead of rebuilding the whole figure.
+        trigger = callback_context.triggered_id
+        if trigger == 'global-sep-slider' or (
+                isinstance(trigger, dict) and trigger.get('type') in ('bg-slider', 'int-slider')):
+            patched = Patch()
+            for pos, y in trace_updates(angle_min, angle_max, global_sep,
+                                        bg_values, int_values, files):
+                patched['data'][pos]['y'] = y
+            return patched
+
+        # The pre-serialized dict avoids re-running Figure-to-JSON on every hit;
+        # Dash accepts a plain dict as a figure property value.
+        fig = generate_figure_json(angle_min, angle_max, global_sep, bg_values, int_values, files)
         # Here we apply the legend visibility:
-        fig.update_layout(
-            legend=dict(
-                font=dict(family="Dejavu Sans", size=20),
-                yanchor='top',
-                xanchor='right',
-                x=0.99,
-                y=0.99,
-            ),
-            showlegend=show_legend
-        )
+        fig['layout']['legend'] = _LEGEND_CONFIG
+        fig['layout']['showlegend'] = show_legend
         return fig
 
+    # Callback: Apply legend visibility as a layout patch. Toggling the legend
+    # is cheap, so it must not trigger a full figure regeneration.
+    @app.callback(
+        Output('graph', 'figure', allow_duplicate=True),
+        Input('legend-store', 'data'),
+        prevent_initial_call=True
+    )
+    def update_legend(show_legend):
+        patched = Patch()
+        patched['layout']['showlegend'] = show_legend
+        return patched
+
     # Combined Callback: Update angle sliders from file-store changes, reset-button, or graph relayout.
     @app.callback(
         Output('angle-min-slider', 'value'),
@@ -118,26 +203,31 @@ def register_callbacks(app):
         if not ctx.triggered:
             return current_min, current_max
 
-        trigger = ctx.triggered[0]['prop_id']
+        trigger = ctx.triggered_id  # Pre-parsed id, no prop_id string splitting.
         # If file-store was updated or reset is clicked, update to computed defaults.
-        if trigger.startswith("file-store") or trigger.startswith("reset-button"):
+        if trigger in ("file-store", "reset-button"):
             if files:
-                new_min, new_max = compute_default_angles(files)
+                new_min, new_max = compute_default_angles_cached(files)
                 return new_min, new_max
             return 10, 90
 
         # If the graph relayout triggered this callback.
-        if trigger.startswith("graph"):
+        if trigger == "graph":
             if relayoutData:
                 if 'xaxis.autorange' in relayoutData:
                     if files:
-                        new_min, new_max = compute_default_angles(files)
+                        new_min, new_max = compute_default_angles_cached(files)
                         return new_min, new_max
                     return 10, 90
                 if 'xaxis.range[0]' in relayoutData and 'xaxis.range[1]' in relayoutData:
+                    v0 = relayoutData['xaxis.range[0]']
+                    v1 = relayoutData['xaxis.range[1]']
+                    # Plotly delivers these as JSON numbers; only coerce the
+                    # odd string value, and never truncate - sub-degree zoom
+                    # precision matters for XRD.
                     try:
-                        new_min = float(relayoutData['xaxis.range[0]'])
-                        new_max = float(relayoutData['xaxis.range[1]'])
+                        new_min = v0 if isinstance(v0, (int, float)) else float(v0)
+                        new_max = v1 if isinstance(v1, (int, float)) else float(v1)
                         return new_min, new_max
                     except Exception:
                         pass
@@ -161,87 +251,35 @@ def register_callbacks(app):
         int_defaults = [100] * num_files
         return 0, bg_defaults, int_defaults
 
-    # Callback: Update the aspect ratio of the graph container.
-    @app.callback(
+    # Clientside callback: Update the aspect ratio of the graph container.
+    # Pure string formatting, so it runs in the browser without a server round-trip.
+    app.clientside_callback(
+        """
+        function(w, h) {
+            var ratio = (parseFloat(h) / parseFloat(w)) * 100;
+            if (!isFinite(ratio) || ratio <= 0) {
+                ratio = 75;  // Fall back to the default 4:3 ratio.
+            }
+            return {position: 'relative', width: '100%', paddingBottom: ratio + '%'};
+        }
+        """,
         Output('graph-wrapper', 'style'),
         Input('width-ratio-input', 'value'),
         Input('height-ratio-input', 'value'),
         prevent_initial_call=True
     )
-    def update_aspect_ratio(width_ratio, height_ratio):
-        try:
-            w = float(width_ratio)
-            h = float(height_ratio)
-            padding_bottom = f"{(h / w) * 100}%"
-            return {'position': 'relative', 'width': '100%', 'paddingBottom': padding_bottom}
-        except Exception:
-            return {'position': 'relative', 'width': '100%', 'paddingBottom': '75%'}
-
-    # Callback: Save the current plot in high resolution using the selected ratio.
-        # Callback: Save the current plot in high resolution using the selected ratio.
-    @app.callback(
+
+    # Clientside callback: Save the current plot as a PNG. The figure is
+    # already rendered by Plotly.js in the browser, so the export runs there
+    # (see assets/save.js) instead of round-tripping through a server-side
+    # headless-browser render.
+    app.clientside_callback(
+        ClientsideFunction(namespace='xrd', function_name='savePlot'),
         Output("download", "data"),
         Input("save-white-button", "n_clicks"),
         Input("save-transparent-button", "n_clicks"),
-        State('angle-min-slider', 'value'),
-        State('angle-max-slider', 'value'),
-        State('global-sep-slider', 'value'),
-        State({'type': 'bg-slider', 'index': ALL}, 'value'),
-        State({'type': 'int-slider', 'index': ALL}, 'value'),
-        State('file-store', 'data'),
         State('width-ratio-input', 'value'),
         State('height-ratio-input', 'value'),
-        State('legend-store', 'data'),  # New state to capture legend toggle
+        State('export-quality', 'value'),
         prevent_initial_call=True
-    )
-    def save_plot(n_white, n_transparent, angle_min, angle_max, global_sep,
-                  bg_values, int_values, files, width_ratio, height_ratio, show_legend):
-        if not files:
-            return dash.no_update
-        
-        # Generate the figure as usual.
-        fig = generate_figure(angle_min, angle_max, global_sep, bg_values, int_values, files)
-        
-        ctx = callback_context
-        if not ctx.triggered:
-            raise dash.exceptions.PreventUpdate
-        trigger = ctx.triggered[0]['prop_id']
-        
-        # If the transparent button was clicked, set a transparent background.
-        if trigger.startswith("save-transparent-button"):
-            fig.update_layout(
-                paper_bgcolor="rgba(0,0,0,0)",
-                plot_bgcolor="rgba(0,0,0,0)"
-            )
-        # Otherwise (save-white-button), keep white background.
-        
-        # Apply the legend configuration and visibility.
-        fig.update_layout(
-            legend=dict(
-                font=dict(family="Dejavu Sans", size=20),
-                yanchor='top',
-                xanchor='right',
-                x=0.99,
-                y=0.99,
-            ),
-            showlegend=show_legend
-        )
-        
-        try:
-            w_ratio = float(width_ratio)
-            h_ratio = float(height_ratio)
-            height = int(800 * (h_ratio / w_ratio))
-        except Exception:
-            height = 600
-
-        img_bytes = pio.to_image(fig, format='png', width=800, height=height, scale=4)
-        def write_bytes(bytes_io):
-            bytes_io.write(img_bytes)
-        
-        # Set filename based on button type.
-        if trigger.startswith("save-white-button"):
-            filename = "plot_white.png"
-        else:
-            filename = "plot_transparent.png"
-        
-        return dcc.send_bytes(write_bytes, filename)
\ No newline at end of file
+    )
\ No newline at end of file
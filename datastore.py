@@ -0,0 +1,17 @@
+import uuid
+import diskcache
+
+# Server-side store for uploaded XRD data. Parsed arrays are written here once
+# at upload time and referenced from the browser-side file-store by id, so
+# callbacks ship small ids back and forth instead of full data arrays.
+_uploads = diskcache.Cache('.cache/uploads')
+
+def put_arrays(x, y):
+    """Stores a parsed (x, y) array pair and returns its id."""
+    file_id = uuid.uuid4().hex
+    _uploads[file_id] = (x, y)
+    return file_id
+
+def get_arrays(file_id):
+    """Returns the (x, y) pair for an id, or None if it is unknown."""
+    return _uploads.get(file_id)
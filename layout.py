@@ -1,29 +1,59 @@
+import functools
+
 from dash import dcc, html
 import dash
 
+# Shared style/marks/tooltip dicts, hoisted to module level so per-file control
+# construction does not re-allocate identical dicts for every file on every
+# layout refresh. Dash serializes these without mutating them, so sharing is safe.
+_FILENAME_STYLE = {
+    'display': 'inline-block',
+    'width': '200px',
+    'fontWeight': 'bold',
+    'overflow': 'hidden',
+    'textOverflow': 'ellipsis',
+    'whiteSpace': 'nowrap'
+}
+_SLIDER_LABEL_STYLE = {'margin-left': '20px'}
+_SLIDER_WRAP_STYLE = {'display': 'inline-block', 'margin-left': '10px', 'width': '80%'}
+_ROW_STYLE = {'display': 'flex', 'align-items': 'center', 'margin-bottom': '20px'}
+_TOOLTIP = {"placement": "bottom", "always_visible": True}
+_BG_MARKS = {
+    -10: {'label': "-10", 'style': {'fontSize': '18px'}},
+     0:  {'label': "0",   'style': {'fontSize': '18px'}},
+     50: {'label': "50",  'style': {'fontSize': '18px'}}
+}
+_INT_MARKS = {
+    1:   {'label': "1",   'style': {'fontSize': '18px'}},
+    100: {'label': "100", 'style': {'fontSize': '18px'}},
+    200: {'label': "200", 'style': {'fontSize': '18px'}}
+}
+_ANGLE_MARKS = {i: {'label': str(i), 'style': {'fontSize': '18px'}} for i in range(0, 101, 10)}
+
 def create_file_control(index, filename):
     """
     Creates the layout for per-file controls.
     Removes the '.xy' extension (case insensitive) from the filename if it exists.
     The filename is rendered in a fixed-width container with text truncation.
     """
-    corrected_filename = filename
-    if corrected_filename.lower().endswith('.xy'):
-        corrected_filename = corrected_filename[:-3]
+    # Strip the extension before the cache lookup so 'a.xy' and 'a.XY' share
+    # one entry. Lowercasing only the suffix avoids copying the whole name.
+    if filename[-3:].lower() == '.xy':
+        filename = filename[:-3]
+    return _build_file_control(index, filename)
+
+# The control row is a pure function of (index, filename), and Dash serializes
+# components without mutating them, so rows can be memoized and reused across
+# re-renders of the controls section.
+@functools.lru_cache(maxsize=512)
+def _build_file_control(index, corrected_filename):
     return html.Div([
         html.Div(
             corrected_filename,
-            style={
-                'display': 'inline-block',
-                'width': '200px',
-                'fontWeight': 'bold',
-                'overflow': 'hidden',
-                'textOverflow': 'ellipsis',
-                'whiteSpace': 'nowrap'
-            },
+            style=_FILENAME_STYLE,
             title=corrected_filename
         ),
-        html.Label("BG", style={'margin-left': '20px'}),
+        html.Label("BG", style=_SLIDER_LABEL_STYLE),
         html.Div(
             dcc.Slider(
                 id={'type': 'bg-slider', 'index': index},
@@ -31,17 +61,13 @@ def create_file_control(index, filename):
                 max=50,
                 step=0.5,
                 value=0,
-                updatemode="drag",
-                marks={
-                    -10: {'label': "-10", 'style': {'fontSize': '18px'}},
-                     0:  {'label': "0",   'style': {'fontSize': '18px'}},
-                     50: {'label': "50",  'style': {'fontSize': '18px'}}
-                },
-                tooltip={"placement": "bottom", "always_visible": True}
+                updatemode="mouseup",
+                marks=_BG_MARKS,
+                tooltip=_TOOLTIP
             ),
-            style={'display': 'inline-block', 'margin-left': '10px', 'width': '80%'}
+            style=_SLIDER_WRAP_STYLE
         ),
-        html.Label("Int", style={'margin-left': '20px'}),
+        html.Label("Int", style=_SLIDER_LABEL_STYLE),
         html.Div(
             dcc.Slider(
                 id={'type': 'int-slider', 'index': index},
@@ -49,19 +75,25 @@ def create_file_control(index, filename):
                 max=200,
                 step=1,
                 value=100,
-                updatemode="drag",
-                marks={
-                    1:   {'label': "1",   'style': {'fontSize': '18px'}},
-                    100: {'label': "100", 'style': {'fontSize': '18px'}},
-                    200: {'label': "200", 'style': {'fontSize': '18px'}}
-                },
-                tooltip={"placement": "bottom", "always_visible": True}
+                updatemode="mouseup",
+                marks=_INT_MARKS,
+                tooltip=_TOOLTIP
             ),
-            style={'display': 'inline-block', 'margin-left': '10px', 'width': '80%'}
+            style=_SLIDER_WRAP_STYLE
         )
-    ], style={'display': 'flex', 'align-items': 'center', 'margin-bottom': '20px'})
+    ], style=_ROW_STYLE)
+
+# The layout tree is pure (no runtime-varying input), so build it once and
+# reuse it instead of reconstructing the whole component graph per call.
+_LAYOUT_CACHE = None
 
 def create_layout(app):
+    global _LAYOUT_CACHE
+    if _LAYOUT_CACHE is None:
+        _LAYOUT_CACHE = _build_layout()
+    return _LAYOUT_CACHE
+
+def _build_layout():
     # Upload component for drag & drop .xy files with a light grey background.
     upload_component = dcc.Upload(
         id="upload-data",
@@ -91,6 +123,10 @@ def create_layout(app):
     # Store to track whether legend is shown (True) or hidden (False). Defaults to True.
     legend_store = dcc.Store(id="legend-store", data=True)
 
+    # Store to track how many per-file control rows are currently rendered,
+    # so new rows can be appended instead of rebuilding all of them.
+    file_count_store = dcc.Store(id="file-count-store", data=0)
+
     # Ratio controls placed above the angle sliders.
     ratio_controls = html.Div([
         html.Div([
@@ -123,12 +159,19 @@ def create_layout(app):
                 }
             )
         ], style={'display': 'inline-block'}),
+        html.Div([
+            html.Label("Quality", style={'marginRight': '10px', 'fontSize': '18px'}),
+            dcc.RadioItems(
+                id='export-quality',
+                options=['draft', 'final'],
+                value='draft',
+                inline=True,
+                style={'display': 'inline-block', 'fontSize': '16px'}
+            )
+        ], style={'display': 'inline-block', 'marginLeft': '20px'}),
     ], style={'margin': '20px 10px', 'textAlign': 'center'})
 
-    # Global slider controls.
-    angle_marks = {i: {'label': str(i), 'style': {'fontSize': '18px'}} for i in range(0, 101, 10)}
-    global_sep_marks = {i: {'label': str(i), 'style': {'fontSize': '18px'}} for i in range(0, 101, 10)}
-
+    # Global slider controls share the module-level 0-100 step-10 marks.
     global_controls = html.Div([
         html.Div([
             html.Label("angle min", style={'fontSize': '18px'}),
@@ -139,7 +182,7 @@ def create_layout(app):
                 step=1,
                 value=10,
                 updatemode="drag",
-                marks=angle_marks,
+                marks=_ANGLE_MARKS,
                 tooltip={"placement": "bottom", "always_visible": True}
             )
         ], style={'margin': '10px', 'width': '45%', "display": "inline-block"}),
@@ -152,7 +195,7 @@ def create_layout(app):
                 step=1,
                 value=90,
                 updatemode="drag",
-                marks=angle_marks,
+                marks=_ANGLE_MARKS,
                 tooltip={"placement": "bottom", "always_visible": True}
             )
         ], style={'margin': '10px', 'width': '45%', "display": "inline-block"}),
@@ -164,17 +207,18 @@ def create_layout(app):
                 max=100,
                 step=1,
                 value=0,
-                updatemode="drag",
-                marks=global_sep_marks,
+                updatemode="mouseup",
+                marks=_ANGLE_MARKS,
                 tooltip={"placement": "bottom", "always_visible": True}
             )
         ], style={'margin': '20px', 'width': '90%'})
     ])
 
-    # Container for per-file controls.
+    # Container for per-file controls. Scrolls past roughly six rows so large
+    # sessions keep the on-screen area (and the browser's paint work) bounded.
     per_file_controls_container = html.Div([
         html.Div(id="per-file-controls-section", style={'padding': '10px'})
-    ])
+    ], style={'maxHeight': '420px', 'overflowY': 'auto'})
 
     # Buttons and download component.
     reset_button = html.Button(
@@ -294,6 +338,7 @@ def create_layout(app):
     layout = html.Div([
         file_store,
         legend_store,  # <--- Add the legend store here
+        file_count_store,
         html.Div([graph_container, controls_container],
                  style={'display': 'flex', 'flexDirection': 'row', 'width': '100%'})
     ], 
@@ -1,8 +1,12 @@
 from dash import Dash
+from cache import cache
 from layout import create_layout
 from callbacks import register_callbacks
 
-app = Dash(__name__)
+# compress=True gzips responses (notably the ~3 MB plotly.js bundle and
+# callback payloads), cutting first-paint time on anything but localhost.
+app = Dash(__name__, compress=True)
+cache.init_app(app.server)
 app.layout = create_layout(app)
 register_callbacks(app)
 
@@ -1,150 +1,355 @@
+import functools
 import io
+import hashlib
 import numpy as np
 import plotly.graph_objects as go
-from scipy.ndimage import gaussian_filter1d
-import base64
+import plotly.io as pio
+
+# pybase64 decodes with SIMD (SSSE3/AVX2) and is several times faster than the
+# stdlib on the multi-megabyte upload payloads; the API is drop-in.
+try:
+    import pybase64 as base64
+except ImportError:
+    import base64
+
+# orjson parses the figure JSON several times faster than the stdlib; plotly's
+# own serializer also picks it up automatically when installed.
+try:
+    import orjson as _json
+except ImportError:
+    import json as _json
+
+from cache import cache
+from datastore import get_arrays
+
+def parse_xy(raw):
+    """
+    Parses two-column .xy data (bytes) into separate float32 x/y arrays.
+    Returns None if the data is not a valid two-column numeric table.
+    """
+    try:
+        # Explicit dtype skips type inference and parses straight to float32;
+        # ndmin=2 guarantees a 2D table even for single-row files.
+        data = np.loadtxt(io.BytesIO(raw), dtype=np.float32, usecols=(0, 1), ndmin=2)
+    except Exception:
+        return None
+    if data.shape[0] == 0:
+        return None
+    # Split the 2D table into separate x/y arrays up front: copying the
+    # strided column views into contiguous buffers means every downstream op
+    # reads sequential cache lines.
+    return np.ascontiguousarray(data[:, 0]), np.ascontiguousarray(data[:, 1])
+
+def hash_files(files):
+    """
+    Computes a stable hash of the uploaded-file list for use as a cache key.
+    Upload ids are unique per upload, so filename plus id pins down the data.
+    """
+    h = hashlib.blake2b(digest_size=16)
+    for file in files:
+        h.update(file["filename"].encode())
+        h.update(file["id"].encode())
+    return h.hexdigest()
+
+# Side table mapping a files hash to the actual file list, so the memoized
+# wrapper below is keyed on the small hash rather than the full contents.
+_FILES_BY_KEY = {}
+
+@cache.memoize()
+def _generate_figure_cached(angle_min, angle_max, global_sep, bg_values, int_values, files_key):
+    return generate_figure(angle_min, angle_max, global_sep, list(bg_values), list(int_values),
+                           _FILES_BY_KEY[files_key])
+
+def generate_figure_cached(angle_min, angle_max, global_sep, bg_values, int_values, files):
+    """
+    Memoized front-end to generate_figure. Repeated callback invocations with
+    identical slider state and files are served from the cache instead of
+    re-parsing the data and rebuilding every trace.
+    """
+    files_key = hash_files(files)
+    _FILES_BY_KEY[files_key] = files
+    return _generate_figure_cached(angle_min, angle_max, global_sep,
+                                   tuple(bg_values), tuple(int_values), files_key)
+
+def figure_to_json(fig):
+    """
+    Serializes a figure to a plain dict, which Dash accepts as a figure value.
+    The float32 trace arrays come out as compact binary typed-array entries
+    ({"dtype": "f4", "bdata": ...}) rather than number lists.
+    """
+    return _json.loads(pio.to_json(fig, validate=False))
+
+@cache.memoize()
+def _generate_figure_json_cached(angle_min, angle_max, global_sep, bg_values, int_values, files_key):
+    fig = _generate_figure_cached(angle_min, angle_max, global_sep, bg_values, int_values, files_key)
+    return figure_to_json(fig)
+
+def generate_figure_json(angle_min, angle_max, global_sep, bg_values, int_values, files):
+    """
+    Like generate_figure_cached, but returns the figure pre-serialized to a
+    dict. Caching the serialized form means repeat callback hits skip the
+    Plotly-to-JSON step, which dominates for figures with many traces.
+    """
+    files_key = hash_files(files)
+    _FILES_BY_KEY[files_key] = files
+    return _generate_figure_json_cached(angle_min, angle_max, global_sep,
+                                        tuple(bg_values), tuple(int_values), files_key)
+
+# Cap on points handed to Plotly per trace; beyond the screen's resolving
+# power extra samples only cost serialization and draw time.
+_MAX_TRACE_POINTS = 4000
+
+# Smoothing parameter for displayed traces, with its kernel built once at
+# import: scipy's gaussian_filter1d recomputed the coefficients on every call,
+# which dominated for the short per-trace arrays here. Applying the fixed
+# kernel with np.convolve does the same smoothing in one vectorized pass.
+_SIGMA = 0.1
+_SMOOTH_RADIUS = int(4 * _SIGMA + 0.5)
+_SMOOTH_KERNEL = np.exp(-0.5 * (np.arange(-_SMOOTH_RADIUS, _SMOOTH_RADIUS + 1) / _SIGMA) ** 2)
+_SMOOTH_KERNEL /= _SMOOTH_KERNEL.sum()
+
+def decimate_minmax(x, y, max_points=_MAX_TRACE_POINTS):
+    """
+    Caps a trace at roughly max_points using a min/max envelope: the range is
+    split into buckets and each bucket keeps its lowest and highest sample, so
+    sharp diffraction peaks survive the decimation visually intact.
+    """
+    n = x.size
+    if n <= max_points:
+        return x, y
+    n_buckets = max_points // 2
+    usable = (n // n_buckets) * n_buckets
+    xb = x[:usable].reshape(n_buckets, -1)
+    yb = y[:usable].reshape(n_buckets, -1)
+    rows = np.arange(n_buckets)
+    lo = yb.argmin(axis=1)
+    hi = yb.argmax(axis=1)
+    # Keep the two extremes of each bucket in x order.
+    first = np.minimum(lo, hi)
+    second = np.maximum(lo, hi)
+    xs = np.empty(2 * n_buckets, dtype=x.dtype)
+    ys = np.empty(2 * n_buckets, dtype=y.dtype)
+    xs[0::2] = xb[rows, first]
+    xs[1::2] = xb[rows, second]
+    ys[0::2] = yb[rows, first]
+    ys[1::2] = yb[rows, second]
+    return xs, ys
+
+def _base_trace(file, angle_min, angle_max):
+    """
+    Computes the display-ready (x, y_normalized) arrays for one file at the
+    given angle window: range filter, smoothing, min/max normalization, and
+    decimation. Everything that depends only on the file and the window lives
+    here; the bg/intensity/separation sliders apply an affine transform on top,
+    which is monotonic and therefore does not change the decimation choices.
+    Returns None if the file's data is unavailable.
+    """
+    return _base_trace_cached(file["id"], angle_min, angle_max)
+
+# The base trace is a pure function of (upload id, angle window), reused
+# unchanged across every bg/intensity/separation tick, so an in-process LRU
+# skips the datastore read, filter, and normalization on those moves. The
+# cached arrays are never mutated downstream: scaling allocates fresh output.
+@functools.lru_cache(maxsize=512)
+def _base_trace_cached(file_id, angle_min, angle_max):
+    arrays = get_arrays(file_id)
+    if arrays is None:
+        return None
+    x, y = arrays
+
+    # Filter data by the current angle range. XRD scans are monotonically
+    # increasing in 2-theta, so this is a binary search yielding contiguous
+    # views rather than an O(N) boolean mask plus gather; fall back to the
+    # mask if the data happens to be unsorted.
+    if x.size and x[0] <= x[-1]:
+        lo = np.searchsorted(x, angle_min, side='left')
+        hi = np.searchsorted(x, angle_max, side='right')
+        x_filtered = x[lo:hi]
+        y_filtered = y[lo:hi]
+    else:
+        mask = (x >= angle_min) & (x <= angle_max)
+        x_filtered = x[mask]
+        y_filtered = y[mask]
+
+    if y_filtered.size == 0:
+        return x_filtered, y_filtered
+
+    # Apply Gaussian smoothing with the precomputed kernel. Below half a
+    # sample of sigma the kernel collapses to a single tap, so skip the
+    # convolution (and its output allocation) outright.
+    if _SIGMA < 0.5:
+        y_smoothed = y_filtered
+    else:
+        y_smoothed = np.convolve(y_filtered, _SMOOTH_KERNEL, mode="same")
+
+    # Normalize to [0, 1]. Folding the range into a reciprocal turns the
+    # subtract-then-divide into one multiply plus an in-place scalar subtract
+    # (a single temporary); a flat trace gets inv_range 0 and normalizes to
+    # zeros, matching the old constant-offset branch.
+    y_min = y_smoothed.min()
+    y_range = y_smoothed.max() - y_min
+    inv_range = np.float32(1.0 / y_range) if y_range else np.float32(0.0)
+    y_normalized = y_smoothed * inv_range
+    y_normalized -= y_min * inv_range
+
+    # Decimate to the screen's resolving power. Zooming re-runs this
+    # pipeline at the new angle range (via the relayout -> angle-slider
+    # chain), so detail is restored as the window narrows.
+    return decimate_minmax(x_filtered, y_normalized)
+
+def _scale_trace(y_normalized, idx, global_sep, bg_values, int_values):
+    """Applies the per-file intensity/bg scaling and the global separation offset."""
+    bg = bg_values[idx] if idx < len(bg_values) else 0
+    intensity = int_values[idx] if idx < len(int_values) else 100
+    # Fold the scalar terms first so the array work is one multiply plus one
+    # in-place add (a single temporary) instead of chained allocations.
+    scaled = y_normalized * np.float32(intensity)
+    scaled += np.float32(bg + idx * global_sep)
+    return scaled
+
+def _scale_traces(bases, global_sep, bg_values, int_values):
+    """
+    Scales a batch of base traces, given as (file_index, y_normalized) pairs.
+    Files from the same instrument share an x grid, so after windowing their
+    arrays have equal length; in that case they are stacked into one
+    (n_files, n_points) float32 matrix and scaled in a single vectorized sweep
+    instead of a Python loop of per-file expressions. Mixed-grid uploads fall
+    back to the per-trace path. Returns the scaled y arrays in input order.
+    """
+    if len(bases) > 1 and all(y.size == bases[0][1].size for _, y in bases):
+        idxs = np.array([idx for idx, _ in bases], dtype=np.float32)
+        ints = np.array([int_values[i] if i < len(int_values) else 100 for i, _ in bases],
+                        dtype=np.float32)
+        bgs = np.array([bg_values[i] if i < len(bg_values) else 0 for i, _ in bases],
+                       dtype=np.float32)
+        stacked = np.stack([y for _, y in bases])
+        scaled = stacked * ints[:, None]
+        scaled += (bgs + idxs * np.float32(global_sep))[:, None]
+        return list(scaled)
+    return [_scale_trace(y, idx, global_sep, bg_values, int_values) for idx, y in bases]
+
+def trace_updates(angle_min, angle_max, global_sep, bg_values, int_values, files):
+    """
+    Computes the per-trace y arrays for the current slider state, as
+    (trace_position, y) pairs in trace order. Used to patch the figure in
+    place when only the bg/intensity/separation sliders change: x, ticks, and
+    layout are untouched by those sliders.
+    """
+    bases = []
+    for idx, file in enumerate(files):
+        base = _base_trace(file, angle_min, angle_max)
+        if base is None:
+            continue
+        bases.append((idx, base[1]))
+    scaled = _scale_traces(bases, global_sep, bg_values, int_values)
+    return list(enumerate(scaled))
+
+# Invariant figure styling, registered once as a named template: Plotly
+# validates every property passed to update_layout/update_xaxes per call,
+# whereas a template reference is resolved once here and merged cheaply at
+# figure construction. Per-call work shrinks to the traces, the axis range,
+# and whichever tick mode the current window needs.
+_TICK_FONT = dict(family="Dejavu Sans", size=22)
+pio.templates["xrd"] = go.layout.Template(layout=go.Layout(
+    xaxis=dict(
+        title=dict(text="diffraction angle, 2<i>θ</i>", font=_TICK_FONT),
+        tickfont=_TICK_FONT,
+        ticks="inside",
+        ticklen=10,
+        showline=True,
+        mirror=True,
+        automargin=True
+    ),
+    yaxis=dict(
+        title=dict(text="intensity, a.u.", font=_TICK_FONT),
+        tickfont=_TICK_FONT,
+        showline=True,
+        mirror=True,
+        automargin=True
+    ),
+    autosize=True,
+    margin=dict(l=50, r=50, t=50, b=50)
+))
+_TEMPLATE = "simple_white+xrd"
+_LINE_STYLE = dict(width=2)
+_MED_TICK_LINE = dict(color="black", width=1.5)
+_MIN_TICK_LINE = dict(color="black", width=1)
+
+def _tick_shape(tick, length, line):
+    # Ticks point inside from the x-axis (assumed at the bottom, y=0), so y0
+    # is 0 and y1 sets the tick length in paper coordinates.
+    return dict(type="line", x0=tick, x1=tick, xref="x", yref="paper",
+                y0=0, y1=length, line=line)
 
 def generate_figure(angle_min, angle_max, global_sep, bg_values, int_values, files):
-    sigma = 0.1  # smoothing parameter
-    fig = go.Figure()
-    
+    fig = go.Figure(layout=dict(template=_TEMPLATE))
+
+    traces = []
     for idx, file in enumerate(files):
         name = file["filename"]
-        # Remove .xy extension (case insensitive) from the legend label.
-        if name.lower().endswith('.xy'):
+        # Remove .xy extension (case insensitive) from the legend label;
+        # lowercasing only the suffix avoids copying the whole name.
+        if name[-3:].lower() == '.xy':
             name = name[:-3]
-            
-        try:
-            data = np.genfromtxt(io.StringIO(file["content"]))
-        except Exception:
-            continue
-        
-        if data.ndim < 2 or data.shape[1] < 2:
+
+        base = _base_trace(file, angle_min, angle_max)
+        if base is None:
             continue
-        
-        x = data[:, 0]
-        y = data[:, 1]
-        
-        # Filter data by the current angle range.
-        mask = (x >= angle_min) & (x <= angle_max)
-        x_filtered = x[mask]
-        y_filtered = y[mask]
-        
-        # Apply Gaussian smoothing.
-        y_smoothed = gaussian_filter1d(y_filtered, sigma=sigma)
-        
-        bg = bg_values[idx] if idx < len(bg_values) else 0
-        intensity = int_values[idx] if idx < len(int_values) else 100
-        
-        # Normalize and scale the data.
-        y_min = np.min(y_smoothed)
-        y_max = np.max(y_smoothed)
-        if y_max - y_min == 0:
-            y_normalized = y_smoothed - y_min
-        else: 
-            y_normalized = (y_smoothed - y_min) / (y_max - y_min)
-        y_scaled = y_normalized * intensity
-        
-        final_y = y_scaled + bg + (idx * global_sep)
-        
-        fig.add_trace(go.Scatter(
-            x=x_filtered,
-            y=final_y,
+        traces.append((idx, name, base[0], base[1]))
+
+    # Scale all traces in one batched pass (see _scale_traces), then feed
+    # them to Plotly in trace order.
+    scaled = _scale_traces([(idx, y) for idx, _, _, y in traces],
+                           global_sep, bg_values, int_values)
+    for (idx, name, x_plot, _), y_plot in zip(traces, scaled):
+        # Scattergl renders through WebGL instead of one SVG node per point,
+        # which keeps pan/zoom responsive for dense XRD patterns.
+        fig.add_trace(go.Scattergl(
+            x=x_plot,
+            y=y_plot,
             mode='lines',
             name=name,
-            line=dict(width=2)
+            line=_LINE_STYLE
         ))
     
-    # Update layout with increased font sizes for titles.
-    fig.update_layout(
-        xaxis_title="diffraction angle, 2<i>θ</i>",
-        xaxis_title_font=dict(family="Dejavu Sans", size=22),
-        yaxis_title="intensity, a.u.",
-        yaxis_title_font=dict(family="Dejavu Sans", size=22),
-        template="simple_white",
-        autosize=True,
-        margin=dict(l=50, r=50, t=50, b=50)
-    )
-    
     # Determine the x-axis range.
     x_range = angle_max - angle_min
     
     if x_range < 15:
         # For small ranges, keep existing tick settings.
         tick_values = list(range(int(np.ceil(angle_min)), int(np.floor(angle_max)) + 1))
-        fig.update_xaxes(
-            tickmode="array",
-            tickvals=tick_values,
-            tickfont=dict(family="Dejavu Sans", size=22),
-            ticks="inside",
-            ticklen=10,
-            showline=True,
-            mirror=True,
-            automargin=True
-        )
+        fig.update_xaxes(tickmode="array", tickvals=tick_values)
     else:
         # For larger ranges, set major ticks (every 10°) to be big and drawn inside.
         major_start = int(np.floor(angle_min / 10.0)) * 10
-        fig.update_xaxes(
-            tickmode="linear",
-            tick0=major_start,
-            dtick=10,
-            tickfont=dict(family="Dejavu Sans", size=22),
-            ticks="inside",
-            ticklen=10,
-            showline=True,
-            mirror=True,
-            automargin=True
-        )
+        fig.update_xaxes(tickmode="linear", tick0=major_start, dtick=10)
         
-        # Now add custom medium (every 5° excluding 10° multiples) and minor ticks (every 1° excluding 5° multiples)
-        shapes = []
-        # Medium ticks: every 5° that is not a multiple of 10.
-        for tick in np.arange(np.ceil(angle_min/5)*5, angle_max, 5):
-            if tick % 10 == 0:
-                continue
-            shapes.append(dict(
-                type="line",
-                x0=tick,
-                x1=tick,
-                xref="x",
-                yref="paper",
-                # Since ticks point inside from the x-axis (assumed at the bottom, y=0),
-                # here y0 is 0 and y1 defines the tick length.
-                y0=0,
-                y1=0.02,  # medium tick length (adjust as needed)
-                line=dict(color="black", width=1.5)
-            ))
-        # Minor ticks: every 1° that is not a multiple of 5.
-        for tick in np.arange(np.ceil(angle_min), angle_max+1, 1):
-            if tick % 5 == 0:
-                continue
-            shapes.append(dict(
-                type="line",
-                x0=tick,
-                x1=tick,
-                xref="x",
-                yref="paper",
-                y0=0,
-                y1=0.01,  # minor tick length (adjust as needed)
-                line=dict(color="black", width=1)
-            ))
+        # Now add custom medium (every 5° excluding 10° multiples) and minor
+        # ticks (every 1° excluding 5° multiples). The positions are computed
+        # with vectorized arange + modulo masks; only the surviving ticks pay
+        # for a shape dict.
+        med = np.arange(np.ceil(angle_min / 5) * 5, angle_max, 5)
+        med = med[med % 10 != 0]
+        minor = np.arange(np.ceil(angle_min), angle_max + 1, 1)
+        minor = minor[minor % 5 != 0]
+        shapes = [_tick_shape(t, 0.02, _MED_TICK_LINE) for t in med.tolist()]
+        shapes += [_tick_shape(t, 0.01, _MIN_TICK_LINE) for t in minor.tolist()]
         fig.update_layout(shapes=shapes)
     
-    # Configure y-axis with a complete box and proper tick fonts.
-    fig.update_yaxes(
-        tickfont=dict(family="Dejavu Sans", size=22),
-        showline=True,
-        mirror=True,
-        automargin=True
-    )
-    
     # Force x-axis to display the full angle range.
     fig.update_xaxes(range=[angle_min, angle_max])
     
     return fig
 
+# Re-uploads of the same file are common during iterative sessions; caching on
+# the raw upload string skips the repeated base64 decode. An in-process LRU is
+# enough here since uploads are handled by a single worker.
+@functools.lru_cache(maxsize=32)
 def parse_contents(contents):
-    content_type, content_string = contents.split(',')
-    decoded = base64.b64decode(content_string)
-    return decoded.decode('utf-8')
\ No newline at end of file
+    """
+    Extracts the payload of a data-URL upload as raw bytes. Locating the comma
+    with find and slicing only the tail avoids materializing the header half,
+    and skipping the utf-8 round-trip saves two full passes per upload; the
+    numeric parser consumes bytes directly.
+    """
+    return base64.b64decode(contents[contents.find(',') + 1:])
\ No newline at end of file